@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from functools import partial
-from itertools import count
 from typing import TYPE_CHECKING, Any, Callable, Generic, Type, cast, overload, ClassVar
+from weakref import WeakValueDictionary
 
 import vapoursynth as vs
 from vstools import CustomIndexError, CustomTypeError, CustomValueError, InvalidSubsamplingError, copy_signature
@@ -21,11 +21,19 @@ __all__ = [
 ]
 
 
+_VS_FLOAT = vs.FLOAT
+
+_cache_inner_classes = WeakValueDictionary[tuple[type, Any], type]()
+
+
 @dataclass
 class PyPluginOptions:
     force_precision: int | None = None
     shift_chroma: bool = False
 
+    def __post_init__(self) -> None:
+        self._cache = WeakValueDictionary[tuple[vs.VideoNode, int | None, bool], vs.VideoNode]()
+
     @overload
     def norm_clip(self, clip: vs.VideoNode) -> vs.VideoNode:
         ...
@@ -38,17 +46,24 @@ class PyPluginOptions:
         if not clip:
             return clip
 
+        key = (clip, self.force_precision, self.shift_chroma)
+
+        if (cached := self._cache.get(key)) is not None:
+            return cached
+
+        src = clip
+
         assert (fmt := clip.format)
 
         if self.force_precision:
-            if fmt.sample_type is not vs.FLOAT or fmt.bits_per_sample != self.force_precision:
+            if fmt.sample_type is not _VS_FLOAT or fmt.bits_per_sample != self.force_precision:
                 clip = clip.resize.Point(
-                    format=fmt.replace(sample_type=vs.FLOAT, bits_per_sample=self.force_precision).id,
+                    format=fmt.replace(sample_type=_VS_FLOAT, bits_per_sample=self.force_precision).id,
                     dither_type='none'
                 )
 
         if self.shift_chroma:
-            if fmt.sample_type is not vs.FLOAT and self.force_precision != 32:
+            if fmt.sample_type is not _VS_FLOAT and self.force_precision != 32:
                 raise CustomValueError(
                     f'{self.__class__.__name__}: You need to have a clip with float sample type for shift_chroma=True!'
                 )
@@ -56,6 +71,9 @@ class PyPluginOptions:
             if fmt.num_planes == 3:
                 clip = clip.std.Expr(['', 'x 0.5 +'])
 
+        if clip is not src:
+            self._cache[key] = clip
+
         return clip
 
     def ensure_output(self, plugin: PyPlugin[FD_T], clip: vs.VideoNode) -> vs.VideoNode:
@@ -74,7 +92,8 @@ class PyPluginOptions:
 class PyPluginBase(Generic[FD_T, DT_T], PyPluginBackendBase[DT_T]):
     if not TYPE_CHECKING:
         __slots__ = (
-            'filter_data', 'clips', 'ref_clip', 'fd', '_input_per_plane'
+            'filter_data', 'output_per_plane', 'clips', 'ref_clip', 'out_format', 'fd', 'is_single_plane',
+            '_input_per_plane'
         )
 
     debug: bool = False
@@ -93,15 +112,28 @@ class PyPluginBase(Generic[FD_T, DT_T], PyPluginBackendBase[DT_T]):
 
     clips: list[vs.VideoNode]
     ref_clip: vs.VideoNode
+    # Must not change after construction, the output functions read its plane count when they're built.
     out_format: vs.VideoFormat
 
     fd: FD_T
 
+    is_single_plane: tuple[bool, ...]
+
+    _input_per_plane: tuple[bool, ...]
+
     def __class_getitem__(cls, fdata: Type[FD_T] | None = None) -> Type[PyPlugin[FD_T]]:
-        class PyPluginInnerClass(cls):  # type: ignore
-            filter_data = fdata
+        if fdata is None and not callable(getattr(cls, 'filter_data', None)):
+            return cls  # type: ignore
+
+        key = (cls, fdata)
+
+        if (inner_class := _cache_inner_classes.get(key)) is None:
+            class PyPluginInnerClass(cls):  # type: ignore
+                filter_data = fdata
+
+            _cache_inner_classes[key] = inner_class = PyPluginInnerClass
 
-        return PyPluginInnerClass
+        return inner_class  # type: ignore
 
     def __init__(
         self,
@@ -148,8 +180,8 @@ class PyPluginBase(Generic[FD_T, DT_T], PyPluginBackendBase[DT_T]):
                 setattr(self, name, value)
                 kwargs.pop(name)
 
-        if callable(self.filter_data):
-            self.fd = self.filter_data(**kwargs)  # type: ignore
+        if callable(filter_data := getattr(self, 'filter_data', None)):
+            self.fd = filter_data(**kwargs)
         else:
             self.fd = None  # type: ignore
 
@@ -159,16 +191,12 @@ class PyPluginBase(Generic[FD_T, DT_T], PyPluginBackendBase[DT_T]):
 
         if not isinstance(inputs_per_plane, list):
             inputs_per_plane = [inputs_per_plane]
+        elif not inputs_per_plane:
+            raise CustomValueError('input_per_plane can\'t be an empty list!', self.__class__)
 
-        for _ in range((1 + len(self.clips)) - len(inputs_per_plane)):
-            inputs_per_plane.append(inputs_per_plane[-1])
+        inputs_per_plane = inputs_per_plane + inputs_per_plane[-1:] * (n_clips - len(inputs_per_plane))
 
-        self._input_per_plane = inputs_per_plane
-
-        self.is_single_plane = [
-            bool(clip.format and clip.format.num_planes == 1)
-            for clip in (self.ref_clip, *self.clips)
-        ]
+        self._input_per_plane = tuple(inputs_per_plane)
 
         if n_clips < self.min_clips or (self.max_clips > 0 and n_clips > self.max_clips):
             max_clips_str = 'inf' if self.max_clips == -1 else self.max_clips
@@ -181,46 +209,54 @@ class PyPluginBase(Generic[FD_T, DT_T], PyPluginBackendBase[DT_T]):
                 'You can\'t have output_per_plane=False with a subsampled clip!', self.__class__
             )
 
-        for idx, clip, ipp in zip(count(-1), (self.ref_clip, *self.clips), self._input_per_plane):
+        is_single_plane = list[bool]()
+
+        for idx, (clip, ipp) in enumerate(zip((self.ref_clip, *self.clips), self._input_per_plane)):
             assert clip.format
+
             if not ipp and (clip.format.subsampling_w or clip.format.subsampling_h):
                 raise InvalidSubsamplingError(
                     self.__class__,
                     'You can\'t have input_per_plane=False with a subsampled clip! ({clip_type})',
-                    clip_type='Ref Clip' if idx == -1 else f'Clip Index: {idx}'
+                    clip_type='Ref Clip' if idx == 0 else f'Clip Index: {idx - 1}'
                 )
 
+            is_single_plane.append(clip.format.num_planes == 1)
+
+        self.is_single_plane = tuple(is_single_plane)
+
     if TYPE_CHECKING:
         def _invoke_func(self) -> OutputFunc_T:
             ...
 
-    @PyPluginBackendBase.ensure_output
     def invoke(self) -> vs.VideoNode:
         output_func = self._invoke_func()
 
+        ref_clip, clips = self.ref_clip, self.clips
+
         modify_frame_partial = partial(
-            vs.core.std.ModifyFrame, self.ref_clip, (self.ref_clip, *self.clips), output_func
+            vs.core.std.ModifyFrame, ref_clip, (ref_clip, *clips), output_func
         )
 
         if self.filter_mode is FilterMode.Serial:
             output = modify_frame_partial()
         elif self.filter_mode is FilterMode.Parallel:
-            output = self.ref_clip.std.FrameEval(lambda n: modify_frame_partial())
+            output = ref_clip.std.FrameEval(lambda n: modify_frame_partial())
         else:
-            if self.clips:
+            if clips:
                 output_func_multi = cast(Callable[[tuple[vs.VideoFrame, ...], int], vs.VideoFrame], output_func)
 
-                @frame_eval_async(self.ref_clip)
+                @frame_eval_async(ref_clip)
                 async def output(n: int) -> vs.VideoFrame:
-                    return output_func_multi(await get_frames(self.ref_clip, *self.clips, frame_no=n), n)
+                    return output_func_multi(await get_frames(ref_clip, *clips, frame_no=n), n)
             else:
                 output_func_single = cast(Callable[[vs.VideoFrame, int], vs.VideoFrame], output_func)
 
-                @frame_eval_async(self.ref_clip)
+                @frame_eval_async(ref_clip)
                 async def output(n: int) -> vs.VideoFrame:
-                    return output_func_single(await get_frame(self.ref_clip, n), n)
+                    return output_func_single(await get_frame(ref_clip, n), n)
 
-        return output
+        return self.options.ensure_output(self, output)
 
     def __call__(self, func: Callable[..., Any]) -> vs.VideoNode:
         this_args = {'self', 'f', 'src', 'dst', 'plane', 'n'}
@@ -261,8 +297,13 @@ class PyPlugin(PyPluginBase[FD_T, memoryview]):
     def _invoke_func(self) -> OutputFunc_T:
         assert self.ref_clip.format
 
-        def _stack_frame(frame: vs.VideoFrame, idx: int) -> memoryview | list[memoryview]:
-            return frame[0] if self.is_single_plane[idx] else [frame[p] for p in {0, 1, 2}]
+        n_clips = 1 + len(self.clips)
+        num_planes = self.out_format.num_planes
+        input_per_plane = self._input_per_plane
+        is_single_plane = self.is_single_plane
+
+        def _stack_frame(frame: vs.VideoFrame, idx: int) -> memoryview | tuple[memoryview, ...]:
+            return frame[0] if is_single_plane[idx] else (frame[0], frame[1], frame[2])
 
         output_func: OutputFunc_T
 
@@ -271,33 +312,33 @@ class PyPlugin(PyPluginBase[FD_T, memoryview]):
                 assert self.process_MultiSrcIPP
                 func_MultiSrcIPP = self.process_MultiSrcIPP
 
+                ipp_indices = tuple(idx for idx, ipp in enumerate(input_per_plane[:n_clips]) if ipp)
+                not_ipp_indices = tuple(idx for idx, ipp in enumerate(input_per_plane[:n_clips]) if not ipp)
+
                 def output_func(f: tuple[vs.VideoFrame, ...], n: int) -> vs.VideoFrame:
                     fout = f[0].copy()
 
-                    pre_stacked_clips = {
-                        idx: _stack_frame(frame, idx)
-                        for idx, frame in enumerate(f)
-                        if not self._input_per_plane[idx]
-                    }
+                    inputs_data: list[Any] = [None] * len(f)
+
+                    for idx in not_ipp_indices:
+                        inputs_data[idx] = _stack_frame(f[idx], idx)
 
-                    for p in range(fout.format.num_planes):
-                        inputs_data = [
-                            frame[p] if self._input_per_plane[idx] else pre_stacked_clips[idx]
-                            for idx, frame in enumerate(f)
-                        ]
+                    for p in range(num_planes):
+                        for idx in ipp_indices:
+                            inputs_data[idx] = f[idx][p]
 
-                        func_MultiSrcIPP(inputs_data, fout[p], fout, p, n)  # type: ignore
+                        func_MultiSrcIPP(inputs_data, fout[p], fout, p, n)
 
                     return fout
             else:
                 assert self.process_SingleSrcIPP
                 func_SingleSrcIPP = self.process_SingleSrcIPP
 
-                if self._input_per_plane[0]:
+                if input_per_plane[0]:
                     def output_func(f: vs.VideoFrame, n: int) -> vs.VideoFrame:
                         fout = f.copy()
 
-                        for p in range(fout.format.num_planes):
+                        for p in range(num_planes):
                             func_SingleSrcIPP(f[p], fout[p], fout, p, n)
 
                         return fout
@@ -307,7 +348,7 @@ class PyPlugin(PyPluginBase[FD_T, memoryview]):
 
                         pre_stacked_clip = _stack_frame(f, 0)
 
-                        for p in range(fout.format.num_planes):
+                        for p in range(num_planes):
                             func_SingleSrcIPP(pre_stacked_clip, fout[p], fout, p, n)  # type: ignore
 
                         return fout
@@ -325,7 +366,7 @@ class PyPlugin(PyPluginBase[FD_T, memoryview]):
 
                     return fout
             else:
-                if self.ref_clip.format.num_planes == 1:
+                if num_planes == 1:
                     if self.process_SingleSrcIPP:
                         func_SingleSrcIPP = self.process_SingleSrcIPP
 
@@ -73,21 +73,21 @@ try:
         def from_device(self, dst: vs.VideoFrame) -> vs.VideoFrame:
             if self.cuda_num_streams:
                 events = []
-                for plane in range(dst.format.num_planes):
+                for plane, dst_pointer in enumerate(self._dst_pointers):
                     events.extend(
                         self._memcpy_async(
                             cast(int, dst.get_write_ptr(plane).value),
-                            self._dst_pointers[plane],
+                            dst_pointer,
                             self.out_data_lengths[plane],
                             runtime.memcpyDeviceToHost
                         )
                     )
                 self._synchronize(events)
             else:
-                for plane in range(dst.format.num_planes):
+                for plane, dst_pointer in enumerate(self._dst_pointers):
                     runtime.memcpy(
                         cast(int, dst.get_write_ptr(plane).value),
-                        self._dst_pointers[plane],
+                        dst_pointer,
                         self.out_data_lengths[plane],
                         runtime.memcpyDeviceToHost
                     )
@@ -167,7 +167,9 @@ try:
 
             self.allocate_src_dst_memory()
 
-            if self.ref_clip.format.num_planes == 1:
+            num_planes = self.out_format.num_planes
+
+            if num_planes == 1:
                 def _stack_whole_frame(frame: vs.VideoFrame, idx: int) -> NDArray[Any]:
                     return self.to_device(frame, idx, 0)
             elif self.channels_last:
@@ -175,12 +177,12 @@ try:
 
                 def _stack_whole_frame(frame: vs.VideoFrame, idx: int) -> NDArray[Any]:
                     return concatenate([
-                        self.to_device(frame, idx, plane)[stack_slice] for plane in {0, 1, 2}
+                        self.to_device(frame, idx, plane)[stack_slice] for plane in (0, 1, 2)
                     ], axis=2)
             else:
                 def _stack_whole_frame(frame: vs.VideoFrame, idx: int) -> NDArray[Any]:
                     return concatenate([
-                        self.to_device(frame, idx, plane) for plane in {0, 1, 2}
+                        self.to_device(frame, idx, plane) for plane in (0, 1, 2)
                     ], axis=0)
 
             def _stack_frame(frame: vs.VideoFrame, idx: int) -> NDArray[Any]:
@@ -205,7 +207,7 @@ try:
                             if not self._input_per_plane[idx]
                         }
 
-                        for p in range(fout.format.num_planes):
+                        for p in range(num_planes):
                             inputs_data = [
                                 self.to_device(frame, idx, p)
                                 if self._input_per_plane[idx]
@@ -224,7 +226,7 @@ try:
                         def output_func(f: vs.VideoFrame, n: int) -> vs.VideoFrame:
                             fout = f.copy()
 
-                            for p in range(fout.format.num_planes):
+                            for p in range(num_planes):
                                 func_SingleSrcIPP(self.to_device(f, 0, p), self.dst_stacked_planes[p], fout, p, n)
 
                             return self.from_device(fout)
@@ -234,7 +236,7 @@ try:
 
                             pre_stacked_clip = _stack_frame(f, 0)
 
-                            for p in range(fout.format.num_planes):
+                            for p in range(num_planes):
                                 func_SingleSrcIPP(pre_stacked_clip, self.dst_stacked_planes[p], fout, p, n)
 
                             return self.from_device(fout)
@@ -57,8 +57,8 @@ try:
         def from_host(
             self, src: NDArray[Any], dst: vs.VideoFrame, planes_slices: tuple[slice, ...]
         ) -> None:
-            for plane in range(dst.format.num_planes):
-                src_ptr, length = src[planes_slices[plane]].__array_interface__['data']
+            for plane, plane_slice in enumerate(planes_slices):
+                src_ptr, length = src[plane_slice].__array_interface__['data']
                 memmove(dst.get_write_ptr(plane), src_ptr, length)
 
         @classmethod
@@ -153,14 +153,14 @@ try:
 
                 def _stack_whole_frame(frame: vs.VideoFrame) -> NDT_T:
                     return concatenate([
-                        cls.to_host(frame, plane, strict)[stack_slice] for plane in {0, 1, 2}
+                        cls.to_host(frame, plane, strict)[stack_slice] for plane in (0, 1, 2)
                     ], axis=axis)
             else:
                 axis = n_channels - 3
 
                 def _stack_whole_frame(frame: vs.VideoFrame) -> NDT_T:
                     return concatenate([
-                        cls.to_host(frame, plane, strict) for plane in {0, 1, 2}
+                        cls.to_host(frame, plane, strict) for plane in (0, 1, 2)
                     ], axis=axis)
 
             return _stack_whole_frame
@@ -168,6 +168,8 @@ try:
         def _invoke_func(self) -> OutputFunc_T:
             assert self.ref_clip.format
 
+            num_planes = self.out_format.num_planes
+
             planes_idx = self.get_planes_slices(self.ref_clip, self.channels_last)
 
             stack_whole_frame = self.get_stack_whole_frame_func(self.channels_last)
@@ -199,7 +201,7 @@ try:
                             if not self._input_per_plane[idx]
                         }
 
-                        for p in range(fout.format.num_planes):
+                        for p in range(num_planes):
                             inputs_data = [
                                 self.to_host(frame, p)
                                 if self._input_per_plane[idx]
@@ -218,7 +220,7 @@ try:
                         def output_func(f: vs.VideoFrame, n: int) -> vs.VideoFrame:
                             fout = f.copy()
 
-                            for p in range(fout.format.num_planes):
+                            for p in range(num_planes):
                                 func_SingleSrcIPP(self.to_host(f, p), self.to_host(fout, p, write=True), fout, p, n)
 
                             return fout
@@ -228,7 +230,7 @@ try:
 
                             pre_stacked_clip = _stack_frame(f, 0)
 
-                            for p in range(fout.format.num_planes):
+                            for p in range(num_planes):
                                 func_SingleSrcIPP(pre_stacked_clip, self.to_host(fout, p, write=True), fout, p, n)
 
                             return fout
@@ -249,7 +251,7 @@ try:
 
                         return fout
                 else:
-                    if self.ref_clip.format.num_planes == 1:
+                    if num_planes == 1:
                         if self.process_SingleSrcIPP:
                             func_SingleSrcIPP = self.process_SingleSrcIPP
 